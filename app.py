@@ -1,17 +1,57 @@
 """Streamlit app for tracking attendance from Jupyter notebooks."""
 
+import io
 import streamlit as st
 import pandas as pd
 from pathlib import Path
-import nbformat
 from datetime import datetime
-import sys
-import os
 
-# Add the parent directory to Python path so we can import from the package
-sys.path.append(str(Path(__file__).parent.parent))
+# attendance_processor sits next to this file, and `streamlit run` puts the
+# script's directory on sys.path, so no path manipulation is needed
+from attendance_processor import (
+    process_attendance_data_cached, notebook_fingerprint, clear_notebook_cache
+)
 
-from attendance_processor import process_attendance_data, get_officer_names
+@st.cache_data(show_spinner=False, ttl=None, max_entries=8)
+def load_reports(base_dir: str, report_types: tuple, fingerprint: tuple):
+    """Cached wrapper around process_attendance_data_cached.
+
+    The fingerprint is part of both the in-memory and the on-disk cache keys, so
+    any added, removed or modified notebook invalidates the cached reports.
+    """
+    return process_attendance_data_cached(
+        base_dir=Path(base_dir),
+        report_types=report_types,
+        fingerprint=fingerprint,
+        cache_dir=Path("exports") / ".cache"
+    )
+
+def show_warnings(df: pd.DataFrame):
+    """Show any warnings collected while processing the notebooks."""
+    warnings = df.attrs.get("warnings")
+    if warnings:
+        st.warning("\n".join(warnings))
+
+def show_report():
+    """Display the report stored in session state.
+
+    Called on every run while a report is stored, so the report stays visible
+    when other widgets rerun the app instead of disappearing.
+    """
+    report_data = st.session_state.report_data
+    if isinstance(report_data, dict):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("All Attendees Summary")
+            st.dataframe(report_data["All Attendees"])
+        
+        with col2:
+            st.subheader("Officers Only Summary")
+            st.dataframe(report_data["Officers Only"])
+    else:
+        st.subheader("Attendance Summary")
+        st.dataframe(report_data)
 
 def main():
     st.set_page_config(
@@ -32,9 +72,10 @@ def main():
     # If we have a report, show the "Generate New Report" button at the top
     if st.session_state.report_data is not None:
         if st.button("🔄 Generate New Report", type="primary"):
-            # Clear the session state
+            # Clear the session state and the per-notebook cache
             st.session_state.report_data = None
             st.session_state.report_type = None
+            clear_notebook_cache()
             # Rerun the app to show the fresh interface
             st.rerun()
         st.divider()
@@ -57,21 +98,21 @@ def main():
     # Process data button
     if st.sidebar.button("Generate Report"):
         with st.spinner("Processing attendance data..."):
+            base_dir = Path(__file__).parent / "attendance"
+            fingerprint = notebook_fingerprint(base_dir)
+            
             if report_type == "Both":
-                # Generate both reports
-                all_attendees_data = process_attendance_data(
-                    base_dir=Path(__file__).parent / "attendance",
-                    report_type="All Attendees"
-                )
-                officers_data = process_attendance_data(
-                    base_dir=Path(__file__).parent / "attendance",
-                    report_type="Officers Only"
-                )
+                # Generate both reports from a single pass over the notebooks
+                reports = load_reports(str(base_dir), ("All Attendees", "Officers Only"), fingerprint)
                 
-                if all_attendees_data is None or officers_data is None:
+                if reports is None:
                     st.error("No attendance data found!")
                     return
                 
+                all_attendees_data = reports["All Attendees"]
+                officers_data = reports["Officers Only"]
+                show_warnings(all_attendees_data)
+                
                 # Store the data in session state
                 st.session_state.report_data = {
                     "All Attendees": all_attendees_data,
@@ -80,15 +121,7 @@ def main():
                 st.session_state.report_type = report_type
                 
                 # Display both reports
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("All Attendees Summary")
-                    st.dataframe(all_attendees_data)
-                
-                with col2:
-                    st.subheader("Officers Only Summary")
-                    st.dataframe(officers_data)
+                show_report()
                 
                 # Export options
                 if export_ipynb or export_excel or export_md:
@@ -107,37 +140,41 @@ def main():
                     
                     if export_excel:
                         excel_path = export_dir / f"attendance_report_{timestamp}.xlsx"
-                        with pd.ExcelWriter(excel_path) as writer:
+                        # Build the workbook in memory and flush it with a single write
+                        buffer = io.BytesIO()
+                        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
                             all_attendees_data.to_excel(writer, sheet_name="All Attendees")
                             officers_data.to_excel(writer, sheet_name="Officers Only")
+                        excel_path.write_bytes(buffer.getvalue())
                         st.success(f"Excel file saved to: {excel_path}")
                     
                     if export_md:
                         md_path = export_dir / f"attendance_report_{timestamp}.md"
-                        with open(md_path, 'w') as f:
-                            f.write("# All Attendees Summary\n\n")
-                            f.write(all_attendees_data.to_markdown())
-                            f.write("\n\n# Officers Only Summary\n\n")
-                            f.write(officers_data.to_markdown())
+                        md_path.write_text(
+                            "# All Attendees Summary\n\n"
+                            + all_attendees_data.to_markdown()
+                            + "\n\n# Officers Only Summary\n\n"
+                            + officers_data.to_markdown(),
+                            encoding="utf-8"
+                        )
                         st.success(f"Markdown file saved to: {md_path}")
             else:
                 # Process single report
-                attendance_data = process_attendance_data(
-                    base_dir=Path(__file__).parent / "attendance",
-                    report_type=report_type
-                )
+                reports = load_reports(str(base_dir), (report_type,), fingerprint)
                 
-                if attendance_data is None:
+                if reports is None:
                     st.error("No attendance data found!")
                     return
                 
+                attendance_data = reports[report_type]
+                show_warnings(attendance_data)
+                
                 # Store the data in session state
                 st.session_state.report_data = attendance_data
                 st.session_state.report_type = report_type
                 
                 # Display the data
-                st.subheader("Attendance Summary")
-                st.dataframe(attendance_data)
+                show_report()
                 
                 # Export options
                 if export_ipynb or export_excel or export_md:
@@ -156,13 +193,16 @@ def main():
                     
                     if export_excel:
                         excel_path = export_dir / f"attendance_report_{timestamp}.xlsx"
-                        attendance_data.to_excel(excel_path)
+                        attendance_data.to_excel(excel_path, engine="xlsxwriter")
                         st.success(f"Excel file saved to: {excel_path}")
                     
                     if export_md:
                         md_path = export_dir / f"attendance_report_{timestamp}.md"
                         attendance_data.to_markdown(md_path)
                         st.success(f"Markdown file saved to: {md_path}")
+    elif st.session_state.report_data is not None:
+        # Keep showing the last report on reruns triggered by other widgets
+        show_report()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,9 +1,19 @@
 """Module for processing attendance data from Jupyter notebooks."""
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+import contextlib
+import os
+import tempfile
+import ijson
 import nbformat
+import numpy as np
+import orjson
 import pandas as pd
-from typing import Dict, List, Optional, Set
+import xxhash
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
 import re
 
 def normalize_name(name: str) -> str:
@@ -18,8 +28,11 @@ def normalize_name(name: str) -> str:
     
     return name
 
-def extract_members_from_cell(cell_text: str) -> List[str]:
-    """Extract member names from the first cell of a notebook."""
+def extract_members_from_cell(cell_text: str, keep: Optional[FrozenSet[str]] = None) -> List[str]:
+    """Extract member names from the first cell of a notebook.
+    
+    If keep is given, only names in it are returned.
+    """
     lines = cell_text.splitlines()
     members_section = False
     members = []
@@ -33,74 +46,141 @@ def extract_members_from_cell(cell_text: str) -> List[str]:
             if stripped.startswith("-") or stripped.startswith("*"):
                 name = stripped[1:].strip()
                 if name:
-                    members.append(normalize_name(name))
+                    name = normalize_name(name)
+                    if keep is None or name in keep:
+                        members.append(name)
             elif stripped == "" or not stripped[0].isspace():
                 break  # End of members section
     return members
 
-def read_notebook(notebook_path: Path) -> Optional[List[str]]:
-    """Read a notebook file and extract member names."""
+# Notebooks smaller than this are parsed in one go; streaming only pays off
+# once there are large output blobs to skip over
+STREAMING_THRESHOLD = 64 * 1024
+
+def _first_cell_source_from_events(events) -> Union[str, List[str]]:
+    """Pull cells[0].source out of an ijson event stream.
+    
+    Stops at the end of the first cell, so a first cell without a source gives
+    "" (like the non-streaming path) instead of the next cell's source.
+    """
+    parts: List[str] = []
+    for prefix, event, value in events:
+        if prefix == 'cells.item.source':
+            if event == 'string':
+                return value
+            if event == 'end_array':
+                return parts
+            if event != 'start_array':
+                raise TypeError("cell source must be a string or a list of strings")
+        elif prefix == 'cells.item.source.item':
+            if event != 'string':
+                raise TypeError("cell source must be a string or a list of strings")
+            parts.append(value)
+        elif prefix == 'cells.item' and event == 'end_map':
+            return ""
+        elif prefix == 'cells' and event == 'end_array':
+            raise IndexError("notebook has no cells")
+    raise KeyError("cells")
+
+def read_first_cell_source(notebook_path: Union[str, Path]) -> str:
+    """Return the source of the first cell of a notebook as a single string."""
+    with open(notebook_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < STREAMING_THRESHOLD:
+            data = orjson.loads(f.read())
+            source = data["cells"][0].get("source", "")
+        else:
+            # Stop as soon as the first cell's source has been read
+            source = _first_cell_source_from_events(ijson.parse(f))
+    
+    if isinstance(source, str):
+        return source
+    if isinstance(source, list) and all(isinstance(part, str) for part in source):
+        return "".join(source)
+    raise TypeError("cell source must be a string or a list of strings")
+
+def read_notebook(
+    notebook_path: Union[str, Path], keep: Optional[FrozenSet[str]] = None
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """Read a notebook file and extract member names.
+    
+    Returns (members, None) on success and (None, warning) if the notebook
+    could not be read. Successful results are memoized per (path, mtime), so
+    unchanged notebooks are not parsed again; failures are retried every time.
+    """
     try:
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            nb = nbformat.read(f, as_version=4)
-            first_cell = nb.cells[0].get("source", "")
-            return extract_members_from_cell(first_cell)
+        mtime_ns = os.stat(notebook_path).st_mtime_ns
+        # Only the first cell is needed, so skip nbformat's schema validation
+        # and per-cell object construction
+        members = _read_members_cached(str(notebook_path), mtime_ns, keep)
     except FileNotFoundError:
-        print(f"Warning: Could not find notebook {notebook_path}")
-        return None
+        return None, f"Could not find notebook {notebook_path}"
+    except (KeyError, IndexError):
+        return None, f"Notebook {notebook_path} has no cells"
+    except (ValueError, ijson.JSONError, AttributeError, TypeError):
+        return None, f"Notebook {notebook_path} is not valid notebook JSON"
+    except OSError as e:
+        return None, f"Could not read notebook {notebook_path}: {e.strerror or e}"
+    
+    return members, None
+
+@lru_cache(maxsize=4096)
+def _read_members_cached(
+    notebook_path: str, mtime_ns: int, keep: Optional[FrozenSet[str]]
+) -> List[str]:
+    """Parse a notebook's members; mtime_ns is only part of the cache key.
+    
+    Errors propagate to read_notebook, and lru_cache does not store them.
+    """
+    return extract_members_from_cell(read_first_cell_source(notebook_path), keep)
+
+def clear_notebook_cache() -> None:
+    """Forget the members memoized by read_notebook."""
+    _read_members_cached.cache_clear()
 
-def get_officer_names() -> Set[str]:
-    """Get the list of officer names from officers.py."""
+@lru_cache(maxsize=1)
+def get_officer_names() -> FrozenSet[str]:
+    """Get the list of officer names from officers.py.
+    
+    The result is cached, so the set is only built once. An empty set means
+    officers.py could not be imported.
+    """
     try:
         # Import the OFFICERS set from officers.py
         from officers import OFFICERS
-        return set(OFFICERS)
+        return frozenset(OFFICERS)
     except ImportError:
-        print("Warning: Could not import OFFICERS from officers.py")
-        return set()
+        return frozenset()
 
-def process_attendance_data(base_dir: Path, report_type: str) -> Optional[pd.DataFrame]:
-    """Process attendance data from notebooks and return a DataFrame."""
-    if not base_dir.exists():
-        print(f"Error: Directory {base_dir} does not exist")
-        return None
-    
-    # Get officer names if needed
-    officers = get_officer_names() if report_type in ["Officers Only", "Both"] else set()
-    
-    # Initialize data structures
-    monthly_data: Dict[str, Dict[str, int]] = {}
-    all_members: Set[str] = set()
-    
-    # Process each month folder
-    month_folders = sorted([f for f in base_dir.iterdir() if f.is_dir()])
-    
-    for month_folder in month_folders:
-        month_name = month_folder.name
-        monthly_data[month_name] = {}
-        
-        # Process each notebook in the month folder
-        for notebook_file in month_folder.glob('*.ipynb'):
-            members = read_notebook(notebook_file)
-            if members:
-                # Filter for officers if needed
-                if report_type == "Officers Only":
-                    members = [m for m in members if m in officers]
-                elif report_type == "Both":
-                    # Keep track of all members for the "Both" report
-                    all_members.update(members)
-                    # Only count officers for this month's data
-                    members = [m for m in members if m in officers]
-                
-                # Update attendance counts
-                for member in members:
-                    monthly_data[month_name][member] = monthly_data[month_name].get(member, 0) + 1
+def notebook_fingerprint(base_dir: Path) -> Tuple[Tuple[str, int, int], ...]:
+    """Return a cheap (relpath, mtime_ns, size) fingerprint of every notebook under base_dir.
     
+    Month folders are included as ("<name>/", 0, 0) entries, since even an
+    empty folder becomes a column of the report.
+    """
+    if not base_dir.exists():
+        return ()
+    with os.scandir(base_dir) as it:
+        entries = [(f"{e.name}/", 0, 0) for e in it if e.is_dir(follow_symlinks=False)]
+    for notebook_file in base_dir.rglob('*.ipynb'):
+        stat = notebook_file.stat()
+        entries.append((notebook_file.relative_to(base_dir).as_posix(), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+def build_report(monthly_data: Dict[str, Counter], report_type: str, officers: FrozenSet[str]) -> pd.DataFrame:
+    """Build the sorted report DataFrame from per-month attendance counts."""
     # Create DataFrame
-    df = pd.DataFrame(monthly_data).fillna(0).astype(int)
+    df = pd.DataFrame(monthly_data).fillna(0)
+    # Monthly counts are at most a few dozen meetings and the Total Members
+    # row at most the number of members, so int16 is plenty and keeps the
+    # reductions below cheap; Total stays int32 to be safe
+    if df.empty or max(df.values.max(), len(df)) < np.iinfo(np.int16).max:
+        df = df.astype('int16')
+    else:
+        df = df.astype('int32')
     
     # Add total column
-    df['Total'] = df.sum(axis=1)
+    df['Total'] = df.sum(axis=1).astype('int32')
     
     # Add total row (unique members per month) at the top
     if report_type == "Officers Only":
@@ -108,18 +188,20 @@ def process_attendance_data(base_dir: Path, report_type: str) -> Optional[pd.Dat
         # First, filter the DataFrame to only include officers
         df = df[df.index.isin(officers)]
         # Then calculate the total members row
-        total_members = df.apply(lambda x: (x > 0).sum())
+        total_members = (df > 0).sum(axis=0)
         # Create a new DataFrame with Total Members at the top
         df = pd.concat([
-            pd.DataFrame([total_members], index=['Total Members']),
+            # Cast to the report's dtypes so the concat doesn't upcast to int64
+            pd.DataFrame([total_members], index=['Total Members']).astype(df.dtypes.to_dict()),
             df
         ])
     else:
         # For all attendees, count all members
-        total_members = df.apply(lambda x: (x > 0).sum())
+        total_members = (df > 0).sum(axis=0)
         # Create a new DataFrame with Total Members at the top
         df = pd.concat([
-            pd.DataFrame([total_members], index=['Total Members']),
+            # Cast to the report's dtypes so the concat doesn't upcast to int64
+            pd.DataFrame([total_members], index=['Total Members']).astype(df.dtypes.to_dict()),
             df
         ])
     
@@ -136,6 +218,143 @@ def process_attendance_data(base_dir: Path, report_type: str) -> Optional[pd.Dat
     
     return df
 
+def process_attendance_data_multi(base_dir: Path, report_types: Sequence[str]) -> Optional[Dict[str, pd.DataFrame]]:
+    """Process attendance data for several report types in a single pass.
+    
+    Every notebook is read once and its members are counted into each report,
+    returning a dict mapping report type to its DataFrame. Any warnings raised
+    while reading are stored in each DataFrame's attrs['warnings'].
+    """
+    if not base_dir.exists():
+        print(f"Error: Directory {base_dir} does not exist")
+        return None
+    
+    # Get officer names if needed
+    needs_officers = any(rt in ["Officers Only", "Both"] for rt in report_types)
+    officers = get_officer_names() if needs_officers else frozenset()
+    # Non-officers can only be dropped while parsing if no report needs them
+    keep = officers if all(rt == "Officers Only" for rt in report_types) else None
+    
+    # Initialize data structures, one set of monthly counts per report
+    monthly_data: Dict[str, Dict[str, Counter]] = {rt: {} for rt in report_types}
+    
+    # Process each month folder; scandir entries carry their file type, so
+    # no extra stat calls are needed to tell folders and notebooks apart
+    with os.scandir(base_dir) as it:
+        month_dirs = sorted([e for e in it if e.is_dir(follow_symlinks=False)], key=lambda e: e.name)
+    tasks = []
+    for month_dir in month_dirs:
+        for counts in monthly_data.values():
+            counts[month_dir.name] = Counter()
+        with os.scandir(month_dir.path) as it:
+            tasks.extend(
+                (month_dir.name, e.path) for e in it
+                if e.name.endswith('.ipynb') and e.is_file(follow_symlinks=False)
+            )
+    
+    # Read notebooks in parallel; parsing is I/O and JSON decoding, the
+    # aggregation below is cheap and stays sequential
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda task: (task[0], *read_notebook(task[1], keep)), tasks))
+    
+    # Warnings are collected and returned with the reports rather than
+    # printed from inside the loop
+    warnings: List[str] = []
+    if needs_officers and not officers:
+        warnings.append("Could not import OFFICERS from officers.py")
+    
+    # Split the reports by the members they count, so each notebook's members
+    # are filtered for officers at most once however many reports need them
+    officer_counts: List[Dict[str, Counter]] = []
+    member_counts: List[Dict[str, Counter]] = []
+    for rt, counts in monthly_data.items():
+        if rt in ["Officers Only", "Both"] and keep is None:
+            officer_counts.append(counts)
+        else:
+            member_counts.append(counts)
+    
+    for month_name, members, warning in results:
+        if warning:
+            warnings.append(warning)
+        if members:
+            for counts in member_counts:
+                counts[month_name].update(members)
+            if officer_counts:
+                officer_members = [m for m in members if m in officers]
+                for counts in officer_counts:
+                    counts[month_name].update(officer_members)
+    
+    reports = {rt: build_report(monthly_data[rt], rt, officers) for rt in report_types}
+    for df in reports.values():
+        df.attrs['warnings'] = warnings
+    return reports
+
+def process_attendance_data(base_dir: Path, report_type: str) -> Optional[pd.DataFrame]:
+    """Process attendance data from notebooks and return a DataFrame."""
+    reports = process_attendance_data_multi(base_dir, [report_type])
+    return None if reports is None else reports[report_type]
+
+# Part of the on-disk cache key; bump it whenever parsing, name normalization
+# or the report layout changes so reports cached by older code are ignored
+REPORT_CACHE_VERSION = 1
+
+def process_attendance_data_cached(
+    base_dir: Path,
+    report_types: Sequence[str],
+    fingerprint: Tuple[Tuple[str, int, int], ...],
+    cache_dir: Path,
+) -> Optional[Dict[str, pd.DataFrame]]:
+    """Like process_attendance_data_multi, but persists reports as parquet files.
+    
+    Files are keyed by a hash of the notebook fingerprint, the officer names and
+    REPORT_CACHE_VERSION, so a report is only rebuilt when one of those changes.
+    Unreadable cache files are treated as a miss, and files for other keys are
+    removed whenever new reports are written.
+    """
+    key_source = (REPORT_CACHE_VERSION, fingerprint, sorted(get_officer_names()))
+    key = xxhash.xxh64(repr(key_source).encode()).hexdigest()
+    paths = {
+        rt: cache_dir / f"{key}_{rt.lower().replace(' ', '_')}.parquet"
+        for rt in report_types
+    }
+    try:
+        return {rt: pd.read_parquet(path) for rt, path in paths.items()}
+    except (OSError, ValueError):
+        # Missing, truncated or otherwise unreadable; rebuild below
+        pass
+    
+    reports = process_attendance_data_multi(base_dir, report_types)
+    if reports is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for rt, df in reports.items():
+                _write_parquet_atomic(df, paths[rt])
+            _prune_report_cache(cache_dir, key)
+        except (OSError, ValueError):
+            # The cache is only an optimization; the reports are still valid
+            pass
+    return reports
+
+def _write_parquet_atomic(df: pd.DataFrame, path: Path) -> None:
+    """Write df to path via a temporary file, so readers never see a partial file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_name, compression='zstd')
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+def _prune_report_cache(cache_dir: Path, key: str) -> None:
+    """Remove cached reports that belong to any key other than the current one."""
+    for path in cache_dir.glob('*.parquet'):
+        if not path.name.startswith(f"{key}_"):
+            with contextlib.suppress(OSError):
+                path.unlink()
+
 def create_notebook_report(df: pd.DataFrame) -> nbformat.NotebookNode:
     """Create a Jupyter notebook report from the attendance data."""
     nb = nbformat.v4.new_notebook()
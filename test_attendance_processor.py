@@ -0,0 +1,98 @@
+"""Tests for attendance_processor."""
+
+from pathlib import Path
+
+import pytest
+
+import attendance_processor
+from attendance_processor import (
+    extract_members_from_cell,
+    notebook_fingerprint,
+    process_attendance_data,
+    process_attendance_data_cached,
+)
+
+ATTENDANCE_DIR = Path(__file__).parent / "attendance"
+
+@pytest.mark.parametrize("cell_text, expected", [
+    ("Members:\n* Bob\n- Ann\n\n* Eve", ["Bob", "Ann"]),
+    ("Members:\n\xa0- Nb", ["Nb"]),
+    ("**Members:**\n**Members:**\n* Bob", ["Bob"]),
+    ("Members:\n- members: x\n* Bob", ["Bob"]),
+    ("Members:\n* Bob\r\r\n* Ann", ["Bob"]),
+    ("Members:\r\n* Bob\r\n* Ann\r\n", ["Bob", "Ann"]),
+    ("Members:\n  * Bob\n  text\n* Ann", ["Bob"]),
+    ("Members:\n*\n-   \n* dijkstra", ["Dijkstra (TBD :))"]),
+    ("No list here\n* Bob", []),
+])
+def test_extract_members(cell_text, expected):
+    assert extract_members_from_cell(cell_text) == expected
+
+def test_extract_members_keep():
+    cell_text = "Members:\n* Bob\n* Ann\n* Eve"
+    assert extract_members_from_cell(cell_text, frozenset({"Ann", "Eve"})) == ["Ann", "Eve"]
+
+def test_report_keeps_narrow_dtypes():
+    df = process_attendance_data(ATTENDANCE_DIR, "All Attendees")
+    assert df.index[0] == "Total Members"
+    assert (df.drop(columns="Total").dtypes == "int16").all()
+    assert df["Total"].dtype == "int32"
+
+def test_malformed_notebook_becomes_warning(tmp_path):
+    month_dir = tmp_path / "5.2025"
+    month_dir.mkdir()
+    (month_dir / "good.ipynb").write_text('{"cells": [{"source": "Members:\\n* Bob"}]}')
+    (month_dir / "bad.ipynb").write_text("{not json")
+    
+    df = process_attendance_data(tmp_path, "All Attendees")
+    assert df.loc["Bob", "Total"] == 1
+    assert len(df.attrs["warnings"]) == 1
+    assert "bad.ipynb" in df.attrs["warnings"][0]
+
+def test_report_cache_tracks_officers_and_recovers(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    fingerprint = notebook_fingerprint(ATTENDANCE_DIR)
+    
+    def officers_report(officers):
+        monkeypatch.setattr(attendance_processor, "get_officer_names", lambda: frozenset(officers))
+        return process_attendance_data_cached(
+            ATTENDANCE_DIR, ("Officers Only",), fingerprint, cache_dir
+        )["Officers Only"]
+    
+    assert "Saba" in officers_report({"Saba", "Charles"}).index
+    assert "Saba" not in officers_report({"Charles"}).index
+    # Reports for the old officer set are pruned
+    [cached] = cache_dir.glob("*.parquet")
+    
+    # A truncated cache file is rebuilt instead of failing
+    cached.write_bytes(cached.read_bytes()[:100])
+    assert list(officers_report({"Charles"}).index) == ["Total Members", "Charles"]
+    assert len(cached.read_bytes()) > 100
+
+@pytest.mark.parametrize("source", ["5", '{"a": 1}', "null", '["a", 1]'])
+@pytest.mark.parametrize("padding", [0, 100_000], ids=["small", "streamed"])
+def test_wrongly_typed_source_becomes_warning(tmp_path, source, padding):
+    month_dir = tmp_path / "5.2025"
+    month_dir.mkdir()
+    (month_dir / "bad.ipynb").write_text(
+        f'{{"cells": [{{"source": {source}}}], "metadata": {{"pad": "{"x" * padding}"}}}}'
+    )
+    
+    df = process_attendance_data(tmp_path, "All Attendees")
+    assert df.attrs["warnings"] == [f"Notebook {month_dir / 'bad.ipynb'} is not valid notebook JSON"]
+
+def test_read_errors_are_not_memoized(tmp_path, monkeypatch):
+    notebook = tmp_path / "nb.ipynb"
+    notebook.write_text('{"cells": [{"source": "Members:\\n* Bob"}]}')
+    real_read = attendance_processor.read_first_cell_source
+    
+    def failing_read(path):
+        raise PermissionError(13, "Permission denied")
+    
+    monkeypatch.setattr(attendance_processor, "read_first_cell_source", failing_read)
+    members, warning = attendance_processor.read_notebook(notebook)
+    assert members is None and "Permission denied" in warning
+    
+    # Fixing the problem doesn't change the mtime, but the read is retried
+    monkeypatch.setattr(attendance_processor, "read_first_cell_source", real_read)
+    assert attendance_processor.read_notebook(notebook) == (["Bob"], None)